@@ -1,15 +1,11 @@
-import json
 from http.server import BaseHTTPRequestHandler
 
+from server import send_json_response
+
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        body = json.dumps({"status": "ok"}, ensure_ascii=False, indent=2).encode("utf-8")
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        send_json_response(self, {"status": "ok"})
 
     def log_message(self, format, *args):
         return
@@ -7,7 +7,18 @@ from email.message import EmailMessage
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 
-from server import DEFAULT_SITEMAP_URL, DEFAULT_SUFFIXES, fetch_all_urls_from_sitemap, find_urls_to_delete
+from server import (
+    DEFAULT_SITEMAP_URL,
+    DEFAULT_SUFFIXES,
+    FetchPolicy,
+    UrlVerifier,
+    VERIFY_TABLE_HEADERS,
+    fetch_all_urls_from_sitemap,
+    find_urls_to_delete,
+    parse_flag,
+    render_verify_cells,
+    send_json_response,
+)
 
 
 def _get_env(name: str) -> str:
@@ -70,19 +81,26 @@ def _send_email_smtp(
     return {"status": "sent"}
 
 
-def _render_urls_table_html(urls_to_delete: list[dict]) -> str:
+def _render_urls_table_html(urls_to_delete: list[dict], verified: bool = False) -> str:
     rows = []
     for item in urls_to_delete:
         url = html_lib.escape(str(item.get("url", "")))
-        rows.append(f"<tr><td style=\"padding:8px;border:1px solid #ddd;\"><a href=\"{url}\">{url}</a></td></tr>")
-
-    body_rows = "".join(rows) if rows else "<tr><td colspan=\"2\" style=\"padding:8px;border:1px solid #ddd;\">Sin resultados</td></tr>"
+        verify_cells = render_verify_cells(item) if verified else ""
+        rows.append(f"<tr><td style=\"padding:8px;border:1px solid #ddd;\"><a href=\"{url}\">{url}</a></td>{verify_cells}</tr>")
+
+    headers = ["URL"]
+    if verified:
+        headers += list(VERIFY_TABLE_HEADERS)
+    header_cells = "".join(
+        f"<th style=\"text-align:left;padding:8px;border:1px solid #ddd;background:#f5f5f5;\">{h}</th>" for h in headers
+    )
+    body_rows = "".join(rows) if rows else f"<tr><td colspan=\"{len(headers)}\" style=\"padding:8px;border:1px solid #ddd;\">Sin resultados</td></tr>"
     return (
         "<html><body>"
         "<h3>URLs a eliminar</h3>"
         "<table style=\"border-collapse:collapse;width:100%;font-family:Arial,sans-serif;font-size:14px;\">"
         "<thead><tr>"
-        "<th style=\"text-align:left;padding:8px;border:1px solid #ddd;background:#f5f5f5;\">URL</th>"
+        f"{header_cells}"
         "</tr></thead>"
         f"<tbody>{body_rows}</tbody>"
         "</table>"
@@ -92,12 +110,7 @@ def _render_urls_table_html(urls_to_delete: list[dict]) -> str:
 
 class handler(BaseHTTPRequestHandler):
     def _send_json(self, payload: dict, status_code: int = 200) -> None:
-        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        send_json_response(self, payload, status_code=status_code, etag=False)
 
     def do_GET(self):
         parsed = urlparse(self.path)
@@ -120,6 +133,10 @@ class handler(BaseHTTPRequestHandler):
             suffixes_from_env = os.environ.get("SUFFIXES", "")
             suffixes = _parse_suffixes_csv(suffixes_from_env) or DEFAULT_SUFFIXES
 
+        verify = parse_flag(qs.get("verify", [""])[0])
+        if verify is None:
+            verify = bool(parse_flag(os.environ.get("VERIFY_URLS", "")))
+
         try:
             from_email = _get_env("FROM_EMAIL")
             to_email = _get_env("TO_EMAIL")
@@ -129,9 +146,11 @@ class handler(BaseHTTPRequestHandler):
             smtp_user = _get_env("USER_SMTP")
             smtp_pass = _get_env("PASS_SMTP")
 
+            policy = FetchPolicy.from_env()
             started = time.time()
-            urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url)
+            urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url, policy=policy)
             to_delete = find_urls_to_delete(urls_by_loc, suffixes=suffixes)
+            verify_stats = UrlVerifier.from_env().run(to_delete) if verify else None
             elapsed_ms = int((time.time() - started) * 1000)
 
             report = {
@@ -140,15 +159,18 @@ class handler(BaseHTTPRequestHandler):
                 "total_urls": len(urls_by_loc),
                 "urls_to_delete": to_delete,
                 "count": len(to_delete),
+                "fetch_stats": policy.stats(),
                 "elapsed_ms": elapsed_ms,
             }
+            if verify_stats is not None:
+                report["verify_stats"] = verify_stats
 
             report_json = json.dumps(report, ensure_ascii=False, indent=2)
 
             subject = f"Claro sitemap - URLs a eliminar ({len(to_delete)})"
             text = report_json
 
-            html_body = _render_urls_table_html(to_delete)
+            html_body = _render_urls_table_html(to_delete, verified=verify)
 
             mailersend_resp = _send_email_smtp(
                 smtp_host=smtp_host,
@@ -1,9 +1,21 @@
-import json
 import os
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 
-from server import DEFAULT_SITEMAP_URL, DEFAULT_SUFFIXES, fetch_all_urls_from_sitemap, find_urls_to_delete
+from server import (
+    DEFAULT_SITEMAP_URL,
+    DEFAULT_SUFFIXES,
+    FetchPolicy,
+    UrlVerifier,
+    fetch_all_urls_from_sitemap,
+    fetch_all_urls_sharded,
+    find_urls_to_delete,
+    has_cron_secret,
+    parse_flag,
+    parse_shards,
+    resolve_shard_endpoint,
+    send_json_response,
+)
 
 
 def _parse_suffixes_csv(value: str) -> tuple[str, ...]:
@@ -27,38 +39,51 @@ class handler(BaseHTTPRequestHandler):
             suffixes = _parse_suffixes_csv(suffixes_from_env) or DEFAULT_SUFFIXES
 
         try:
-            urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url)
+            shards = parse_shards(qs.get("shards", [""])[0])
+        except ValueError as e:
+            send_json_response(self, {"error": "invalid_shards", "message": str(e)}, status_code=400)
+            return
+
+        # El modo coordinador lanza hasta MAX_SHARDS invocaciones con CRON_SECRET: exige el secreto.
+        if shards > 1 and not has_cron_secret(qs, self.headers):
+            send_json_response(
+                self,
+                {"error": "unauthorized", "message": "shards > 1 requires CRON_SECRET (?secret=... or X-Cron-Secret)"},
+                status_code=401,
+            )
+            return
+
+        verify = bool(parse_flag(qs.get("verify", [""])[0]))
+        try:
+            policy = FetchPolicy.from_env(hedge=parse_flag(qs.get("hedge", [""])[0]))
+            if shards > 1:
+                urls_by_loc = fetch_all_urls_sharded(
+                    sitemap_url, resolve_shard_endpoint(), shards, policy=policy
+                )
+            else:
+                urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url, policy=policy)
             to_delete = find_urls_to_delete(urls_by_loc, suffixes=suffixes)
+            verify_stats = UrlVerifier.from_env().run(to_delete) if verify else None
         except Exception as e:
-            body = json.dumps(
+            send_json_response(
+                self,
                 {"error": "processing_failed", "message": str(e), "sitemap": sitemap_url},
-                ensure_ascii=False,
-                indent=2,
-            ).encode("utf-8")
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
-            self.send_header("Content-Length", str(len(body)))
-            self.end_headers()
-            self.wfile.write(body)
+                status_code=500,
+            )
             return
 
-        body = json.dumps(
-            {
-                "sitemap": sitemap_url,
-                "suffixes": list(suffixes),
-                "total_urls": len(urls_by_loc),
-                "urls_to_delete": to_delete,
-                "count": len(to_delete),
-            },
-            ensure_ascii=False,
-            indent=2,
-        ).encode("utf-8")
-
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        report = {
+            "sitemap": sitemap_url,
+            "suffixes": list(suffixes),
+            "total_urls": len(urls_by_loc),
+            "urls_to_delete": to_delete,
+            "count": len(to_delete),
+            "shards": shards,
+            "fetch_stats": policy.stats(),
+        }
+        if verify_stats is not None:
+            report["verify_stats"] = verify_stats
+        send_json_response(self, report)
 
     def log_message(self, format, *args):
         return
@@ -0,0 +1,60 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from server import FetchPolicy, has_cron_secret, parse_flag, run_shard, send_json_response
+
+
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload: dict, status_code: int = 200) -> None:
+        send_json_response(self, payload, status_code=status_code)
+
+    def _authorized(self, qs: dict) -> bool:
+        if not os.environ.get("CRON_SECRET", "").strip():
+            return True
+        return has_cron_secret(qs, self.headers)
+
+    def _run(self, sitemap_urls: list[str], hedge: bool | None = None) -> None:
+        sitemap_urls = [str(u).strip() for u in sitemap_urls if str(u).strip()]
+        if not sitemap_urls:
+            self._send_json({"error": "invalid_body", "message": "No sitemaps provided"}, status_code=400)
+            return
+
+        try:
+            result = run_shard(sitemap_urls, policy=FetchPolicy.from_env(hedge=hedge))
+        except Exception as e:
+            self._send_json({"error": "processing_failed", "message": str(e), "sitemaps": sitemap_urls}, status_code=500)
+            return
+
+        self._send_json(result)
+
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        if not self._authorized(qs):
+            self._send_json({"error": "unauthorized"}, status_code=401)
+            return
+        self._run(qs.get("sitemap", []), parse_flag(qs.get("hedge", [""])[0]))
+
+    def do_POST(self):
+        qs = parse_qs(urlparse(self.path).query)
+        if not self._authorized(qs):
+            self._send_json({"error": "unauthorized"}, status_code=401)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Body must be a JSON object with a 'sitemaps' list")
+            sitemap_urls = payload.get("sitemaps")
+            if not isinstance(sitemap_urls, list):
+                raise ValueError("Body must be a JSON object with a 'sitemaps' list")
+        except ValueError as e:
+            self._send_json({"error": "invalid_body", "message": str(e)}, status_code=400)
+            return
+
+        self._run(sitemap_urls, parse_flag(payload.get("hedge")))
+
+    def log_message(self, format, *args):
+        return
@@ -2,11 +2,24 @@ import json
 import html as html_lib
 import os
 import smtplib
+import sqlite3
 import sys
 import time
 from email.message import EmailMessage
 
-from server import DEFAULT_SITEMAP_URL, DEFAULT_SUFFIXES, fetch_all_urls_from_sitemap, find_urls_to_delete
+import url_index
+from server import (
+    DEFAULT_SITEMAP_URL,
+    DEFAULT_SUFFIXES,
+    FetchPolicy,
+    UrlVerifier,
+    VERIFY_TABLE_HEADERS,
+    configured_suffixes,
+    fetch_all_urls_from_sitemap,
+    find_urls_to_delete,
+    parse_flag,
+    render_verify_cells,
+)
 
 
 def _load_env_file(path: str) -> None:
@@ -81,22 +94,28 @@ def _send_email_smtp(
     return {"status": "sent"}
 
 
-def _render_urls_table_html(urls_to_delete: list[dict]) -> str:
+def _render_urls_table_html(urls_to_delete: list[dict], verified: bool = False) -> str:
     rows = []
     for item in urls_to_delete:
         url = html_lib.escape(str(item.get("url", "")))
         lastmod = item.get("ultima_actualizacion", None)
         lastmod_str = "" if lastmod is None else html_lib.escape(str(lastmod))
-        rows.append(f"<tr><td style=\"padding:8px;border:1px solid #ddd;\"><a href=\"{url}\">{url}</a></td><td style=\"padding:8px;border:1px solid #ddd;white-space:nowrap;\">{lastmod_str}</td></tr>")
-
-    body_rows = "".join(rows) if rows else "<tr><td colspan=\"2\" style=\"padding:8px;border:1px solid #ddd;\">Sin resultados</td></tr>"
+        verify_cells = render_verify_cells(item) if verified else ""
+        rows.append(f"<tr><td style=\"padding:8px;border:1px solid #ddd;\"><a href=\"{url}\">{url}</a></td><td style=\"padding:8px;border:1px solid #ddd;white-space:nowrap;\">{lastmod_str}</td>{verify_cells}</tr>")
+
+    headers = ["URL", "Ultima actualización"]
+    if verified:
+        headers += list(VERIFY_TABLE_HEADERS)
+    header_cells = "".join(
+        f"<th style=\"text-align:left;padding:8px;border:1px solid #ddd;background:#f5f5f5;\">{h}</th>" for h in headers
+    )
+    body_rows = "".join(rows) if rows else f"<tr><td colspan=\"{len(headers)}\" style=\"padding:8px;border:1px solid #ddd;\">Sin resultados</td></tr>"
     return (
         "<html><body>"
         "<h3>URLs a eliminar</h3>"
         "<table style=\"border-collapse:collapse;width:100%;font-family:Arial,sans-serif;font-size:14px;\">"
         "<thead><tr>"
-        "<th style=\"text-align:left;padding:8px;border:1px solid #ddd;background:#f5f5f5;\">URL</th>"
-        "<th style=\"text-align:left;padding:8px;border:1px solid #ddd;background:#f5f5f5;\">Ultima actualización</th>"
+        f"{header_cells}"
         "</tr></thead>"
         f"<tbody>{body_rows}</tbody>"
         "</table>"
@@ -111,6 +130,7 @@ def main() -> None:
     sitemap_url = DEFAULT_SITEMAP_URL
     suffixes_from_env = os.environ.get("SUFFIXES", "")
     suffixes = _parse_suffixes_csv(suffixes_from_env) or DEFAULT_SUFFIXES
+    verify = bool(parse_flag(os.environ.get("VERIFY_URLS", "")))
 
     # CLI opcional:
     # python3 local_send_report.py [sitemap_url] [suffixes_csv]
@@ -127,26 +147,40 @@ def main() -> None:
     smtp_user = _get_env("USER_SMTP")
     smtp_pass = _get_env("PASS_SMTP")
 
+    policy = FetchPolicy.from_env()
+    started_at = url_index.utc_now()
     started = time.time()
-    urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url)
+    urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url, policy=policy)
     to_delete = find_urls_to_delete(urls_by_loc, suffixes=suffixes)
+    verify_stats = UrlVerifier.from_env().run(to_delete) if verify else None
     elapsed_ms = int((time.time() - started) * 1000)
 
+    # Historial opcional en SQLite (solo si URL_INDEX_DB está definido)
+    index_db = url_index.index_path_from_env()
+    if index_db and tuple(suffixes) == configured_suffixes():
+        try:
+            url_index.save_crawl(index_db, sitemap_url, suffixes, urls_by_loc, to_delete, started_at=started_at)
+        except sqlite3.Error as e:
+            print(f"WARN - URL index not updated: {e}", file=sys.stderr)
+
     report = {
         "sitemap": sitemap_url,
         "suffixes": list(suffixes),
         "total_urls": len(urls_by_loc),
         "urls_to_delete": to_delete,
         "count": len(to_delete),
+        "fetch_stats": policy.stats(),
         "elapsed_ms": elapsed_ms,
     }
+    if verify_stats is not None:
+        report["verify_stats"] = verify_stats
 
     report_json = json.dumps(report, ensure_ascii=False, indent=2)
 
     subject = f"Claro sitemap - URLs a eliminar ({len(to_delete)})"
     text = report_json
 
-    html_body = _render_urls_table_html(to_delete)
+    html_body = _render_urls_table_html(to_delete, verified=verify)
 
     resp = _send_email_smtp(
         smtp_host=smtp_host,
@@ -1,16 +1,33 @@
+import email.utils
+import gzip
+import hashlib
+import html as html_lib
+import http.client
 import json
 import os
+import random
+import sqlite3
 import sys
+import threading
 import time
 import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, quote, urljoin, urlparse
+
+import url_index
 
 DEFAULT_SITEMAP_URL = "https://www.claro.com.pe/sitemap.xml"
 DEFAULT_SUFFIXES = ("_test", "-test", "_1", "_bkp", "_2")
 DEFAULT_PORT = 8000
+MAX_SHARDS = 32
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+GZIP_MIN_BYTES = 512
+ETAG_EXCLUDED_KEYS = ("elapsed_ms", "fetch_stats", "verify_stats", "index_error")
+ETAG_EXCLUDED_ENTRY_KEYS = ("latency_ms",)
+VERIFY_TABLE_HEADERS = ("Estado", "Redirige a", "Latencia (ms)")
 
 
 def _load_env_file(path: str) -> None:
@@ -39,6 +56,10 @@ def _parse_suffixes_csv(value: str) -> tuple[str, ...]:
     return tuple([s.strip() for s in raw.split(",") if s.strip()])
 
 
+def configured_suffixes() -> tuple[str, ...]:
+    return _parse_suffixes_csv(os.environ.get("SUFFIXES", "")) or DEFAULT_SUFFIXES
+
+
 def _xml_local_name(tag: str) -> str:
     if "}" in tag:
         return tag.split("}", 1)[1]
@@ -58,10 +79,204 @@ def _http_get(url: str, timeout_seconds: int = 30) -> bytes:
         return resp.read()
 
 
-def fetch_all_urls_from_sitemap(
-    root_sitemap_url: str, timeout_seconds: int = 30, max_sitemaps: int = 2000
+def _parse_retry_after(value: str | None) -> float | None:
+    raw = (value or "").strip()
+    if not raw:
+        return None
+    if raw.isdigit():
+        return float(raw)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class FetchPolicy:
+    def __init__(
+        self,
+        attempt_timeout_seconds: float = 30,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 10,
+        retry_after_max_seconds: float = 30,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        hedge_min_delay_seconds: float = 0.25,
+    ) -> None:
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retry_after_max_seconds = retry_after_max_seconds
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+
+        self._lock = threading.Lock()
+        self._latencies: list[float] = []
+        self._stats = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "retry_after_honored": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "failures": 0,
+        }
+
+    @classmethod
+    def from_env(cls, hedge: bool | None = None) -> "FetchPolicy":
+        if hedge is None:
+            hedge = os.environ.get("FETCH_HEDGE", "").strip().lower() in ("1", "true", "yes")
+        return cls(
+            attempt_timeout_seconds=float(os.environ.get("FETCH_ATTEMPT_TIMEOUT", "") or 30),
+            max_retries=int(os.environ.get("FETCH_MAX_RETRIES", "") or 3),
+            hedge=hedge,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            p95 = self._p95_locked()
+        out["p95_ms"] = None if p95 is None else int(p95 * 1000)
+        return out
+
+    def merge_stats(self, other: dict | None) -> None:
+        if not other:
+            return
+        with self._lock:
+            for key in self._stats:
+                value = other.get(key)
+                if isinstance(value, int):
+                    self._stats[key] += value
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _p95_locked(self) -> float | None:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _hedge_delay(self) -> float | None:
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            p95 = self._p95_locked()
+        return max(p95 or 0.0, self.hedge_min_delay_seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniforme entre 0 y el tope exponencial.
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def _attempt(self, url: str) -> bytes:
+        self._count("attempts")
+        started = time.monotonic()
+        body = _http_get(url, timeout_seconds=self.attempt_timeout_seconds)
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+            if len(self._latencies) > 500:
+                del self._latencies[:100]
+        return body
+
+    def _hedged_attempt(self, url: str, hedge_delay: float) -> bytes:
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary = pool.submit(self._attempt, url)
+            done, _ = wait([primary], timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self._count("hedges")
+            hedged = pool.submit(self._attempt, url)
+            pending = {primary, hedged}
+            error: BaseException | None = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedged:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = error or future.exception()
+            raise error
+        finally:
+            # No se puede cancelar un urlopen en curso: el intento perdedor termina en segundo plano.
+            pool.shutdown(wait=False)
+
+    def get(self, url: str) -> bytes:
+        self._count("requests")
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                hedge_delay = self._hedge_delay()
+                if hedge_delay is None:
+                    return self._attempt(url)
+                return self._hedged_attempt(url, hedge_delay)
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUSES or attempt > self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = _parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                else:
+                    self._count("retry_after_honored")
+                    delay = min(delay, self.retry_after_max_seconds)
+            except (urllib.error.URLError, TimeoutError, ConnectionError, http.client.HTTPException):
+                if attempt > self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt)
+
+            self._count("retries")
+            time.sleep(delay)
+
+
+def _sitemap_index_locs(root: ET.Element) -> list[str]:
+    locs: list[str] = []
+    for sitemap in root:
+        if _xml_local_name(sitemap.tag) != "sitemap":
+            continue
+        loc_el = None
+        for child in sitemap:
+            if _xml_local_name(child.tag) == "loc":
+                loc_el = child
+                break
+        if loc_el is None or not loc_el.text:
+            continue
+        loc = loc_el.text.strip()
+        if loc:
+            locs.append(loc)
+    return locs
+
+
+def _parse_sitemap_xml(sitemap_url: str, xml_bytes: bytes) -> ET.Element:
+    try:
+        return ET.fromstring(xml_bytes)
+    except ET.ParseError as e:
+        raise RuntimeError(f"Invalid XML at {sitemap_url}: {e}")
+
+
+def fetch_urls_from_sitemaps(
+    sitemap_urls: list[str],
+    timeout_seconds: int = 30,
+    max_sitemaps: int = 2000,
+    policy: FetchPolicy | None = None,
+    parsed_roots: dict[str, ET.Element] | None = None,
 ) -> dict[str, str | None]:
-    sitemap_queue: list[str] = [root_sitemap_url]
+    if policy is None:
+        policy = FetchPolicy(attempt_timeout_seconds=timeout_seconds)
+    parsed_roots = parsed_roots or {}
+
+    sitemap_queue: list[str] = list(sitemap_urls)
     seen_sitemaps: set[str] = set()
 
     urls_by_loc: dict[str, str | None] = {}
@@ -75,27 +290,15 @@ def fetch_all_urls_from_sitemap(
         if len(seen_sitemaps) > max_sitemaps:
             raise RuntimeError(f"Max sitemaps exceeded ({max_sitemaps}). Last: {sitemap_url}")
 
-        xml_bytes = _http_get(sitemap_url, timeout_seconds=timeout_seconds)
-        try:
-            root = ET.fromstring(xml_bytes)
-        except ET.ParseError as e:
-            raise RuntimeError(f"Invalid XML at {sitemap_url}: {e}")
+        root = parsed_roots.get(sitemap_url)
+        if root is None:
+            root = _parse_sitemap_xml(sitemap_url, policy.get(sitemap_url))
 
         root_name = _xml_local_name(root.tag)
 
         if root_name == "sitemapindex":
-            for sitemap in root:
-                if _xml_local_name(sitemap.tag) != "sitemap":
-                    continue
-                loc_el = None
-                for child in sitemap:
-                    if _xml_local_name(child.tag) == "loc":
-                        loc_el = child
-                        break
-                if loc_el is None or not loc_el.text:
-                    continue
-                loc = loc_el.text.strip()
-                if loc and loc not in seen_sitemaps:
+            for loc in _sitemap_index_locs(root):
+                if loc not in seen_sitemaps:
                     sitemap_queue.append(loc)
 
         elif root_name == "urlset":
@@ -130,6 +333,172 @@ def fetch_all_urls_from_sitemap(
     return urls_by_loc
 
 
+def fetch_all_urls_from_sitemap(
+    root_sitemap_url: str,
+    timeout_seconds: int = 30,
+    max_sitemaps: int = 2000,
+    policy: FetchPolicy | None = None,
+) -> dict[str, str | None]:
+    return fetch_urls_from_sitemaps(
+        [root_sitemap_url], timeout_seconds=timeout_seconds, max_sitemaps=max_sitemaps, policy=policy
+    )
+
+
+def list_child_sitemaps(
+    root_sitemap_url: str, timeout_seconds: int = 30, policy: FetchPolicy | None = None
+) -> tuple[ET.Element, list[str] | None]:
+    # Devuelve la raíz ya parseada y sus sitemaps hijos si es un sitemapindex (None si es un urlset).
+    if policy is None:
+        policy = FetchPolicy(attempt_timeout_seconds=timeout_seconds)
+    xml_bytes = policy.get(root_sitemap_url)
+    root = _parse_sitemap_xml(root_sitemap_url, xml_bytes)
+    root_name = _xml_local_name(root.tag)
+    if root_name == "sitemapindex":
+        children: list[str] = []
+        for loc in _sitemap_index_locs(root):
+            if loc != root_sitemap_url and loc not in children:
+                children.append(loc)
+        return root, children
+    if root_name == "urlset":
+        return root, None
+    raise RuntimeError(f"Unsupported sitemap root element '{root_name}' at {root_sitemap_url}")
+
+
+def partition_sitemaps(sitemap_urls: list[str], shards: int) -> list[list[str]]:
+    # Bloques contiguos: al unir los shards en orden se respeta el orden del sitemapindex.
+    shards = max(1, min(shards, len(sitemap_urls)))
+    base, extra = divmod(len(sitemap_urls), shards)
+    parts: list[list[str]] = []
+    start = 0
+    for i in range(shards):
+        size = base + (1 if i < extra else 0)
+        parts.append(sitemap_urls[start : start + size])
+        start += size
+    return [p for p in parts if p]
+
+
+def _dispatch_shard(shard_endpoint: str, sitemap_urls: list[str], timeout_seconds: int, hedge: bool) -> dict:
+    body = json.dumps({"sitemaps": sitemap_urls, "hedge": hedge}).encode("utf-8")
+    separator = "&" if "?" in shard_endpoint else "?"
+    req = urllib.request.Request(
+        f"{shard_endpoint}{separator}compact=1",
+        data=body,
+        headers={
+            "User-Agent": "claro-sitemaps-bot/1.0 (+https://github.com/)",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+        },
+        method="POST",
+    )
+    secret = _normalize_secret(os.environ.get("CRON_SECRET", ""))
+    if secret:
+        req.add_header("X-Cron-Secret", secret)
+    with urllib.request.urlopen(req, timeout=timeout_seconds) as resp:
+        raw = resp.read()
+        if (resp.headers.get("Content-Encoding") or "").lower() == "gzip":
+            raw = gzip.decompress(raw)
+    payload = json.loads(raw.decode("utf-8"))
+    if not isinstance(payload, dict) or not isinstance(payload.get("urls"), list):
+        raise RuntimeError(f"Invalid shard response from {shard_endpoint}")
+    return payload
+
+
+def fetch_all_urls_sharded(
+    root_sitemap_url: str,
+    shard_endpoint: str,
+    shards: int,
+    timeout_seconds: int = 30,
+    shard_timeout_seconds: int = 300,
+    policy: FetchPolicy | None = None,
+) -> dict[str, str | None]:
+    if policy is None:
+        policy = FetchPolicy(attempt_timeout_seconds=timeout_seconds)
+    root, children = list_child_sitemaps(root_sitemap_url, timeout_seconds=timeout_seconds, policy=policy)
+    if children is None or shards <= 1 or len(children) <= 1:
+        # La raíz ya está descargada: se reutiliza en lugar de pedirla otra vez.
+        return fetch_urls_from_sitemaps(
+            [root_sitemap_url],
+            timeout_seconds=timeout_seconds,
+            policy=policy,
+            parsed_roots={root_sitemap_url: root},
+        )
+
+    parts = partition_sitemaps(children, shards)
+    with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+        results = list(
+            pool.map(lambda part: _dispatch_shard(shard_endpoint, part, shard_timeout_seconds, policy.hedge), parts)
+        )
+
+    # Dedup global "first-wins" siguiendo el orden de los shards.
+    urls_by_loc: dict[str, str | None] = {}
+    for shard_result in results:
+        policy.merge_stats(shard_result.get("fetch_stats"))
+        for loc, lastmod in shard_result["urls"]:
+            if loc not in urls_by_loc:
+                urls_by_loc[loc] = lastmod
+    return urls_by_loc
+
+
+def _normalize_secret(value: str) -> str:
+    v = (value or "").strip()
+    if len(v) >= 2 and ((v[0] == v[-1] == "'") or (v[0] == v[-1] == '"')):
+        v = v[1:-1].strip()
+    return v
+
+
+def has_cron_secret(qs: dict, headers) -> bool:
+    # True si CRON_SECRET está definido y la petición lo trae (?secret=... o X-Cron-Secret).
+    cron_secret = _normalize_secret(os.environ.get("CRON_SECRET", ""))
+    if not cron_secret:
+        return False
+    provided = _normalize_secret(qs.get("secret", [""])[0] or "")
+    if not provided:
+        provided = _normalize_secret(headers.get("X-Cron-Secret") or "")
+    return provided == cron_secret
+
+
+def resolve_shard_endpoint(fallback: str | None = None) -> str:
+    # Nunca se deduce de los headers de la petición: el coordinador envía CRON_SECRET a este endpoint.
+    configured = os.environ.get("SHARD_ENDPOINT", "").strip()
+    if configured:
+        return configured
+    if fallback:
+        return fallback
+    raise RuntimeError("Missing environment variable: SHARD_ENDPOINT (required for shards > 1)")
+
+
+def parse_shards(value: str) -> int:
+    raw = (value or "").strip()
+    if not raw:
+        return 1
+    shards = int(raw)
+    if shards < 1:
+        raise ValueError("shards must be >= 1")
+    return min(shards, MAX_SHARDS)
+
+
+def parse_flag(value: str | bool | None) -> bool | None:
+    if isinstance(value, bool):
+        return value
+    raw = ("" if value is None else str(value)).strip().lower()
+    if not raw:
+        return None
+    return raw in ("1", "true", "yes", "on")
+
+
+def run_shard(sitemap_urls: list[str], timeout_seconds: int = 30, policy: FetchPolicy | None = None) -> dict:
+    if policy is None:
+        policy = FetchPolicy(attempt_timeout_seconds=timeout_seconds)
+    urls_by_loc = fetch_urls_from_sitemaps(sitemap_urls, timeout_seconds=timeout_seconds, policy=policy)
+    return {
+        "sitemaps": sitemap_urls,
+        "total_urls": len(urls_by_loc),
+        "urls": [[loc, lastmod] for loc, lastmod in urls_by_loc.items()],
+        "fetch_stats": policy.stats(),
+    }
+
+
 def find_urls_to_delete(
     urls_by_loc: dict[str, str | None], suffixes: tuple[str, ...] = DEFAULT_SUFFIXES
 ) -> list[dict]:
@@ -148,16 +517,280 @@ def find_urls_to_delete(
     return sorted(out, key=lambda x: x["url"])
 
 
+class UrlVerifier:
+    def __init__(
+        self,
+        concurrency: int = 8,
+        per_host_rps: float = 5,
+        budget_seconds: float = 60,
+        timeout_seconds: float = 10,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.per_host_rps = per_host_rps
+        self.budget_seconds = budget_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_slot: dict[str, float] = {}
+        self._connections: list[http.client.HTTPConnection] = []
+
+    @classmethod
+    def from_env(cls) -> "UrlVerifier":
+        return cls(
+            concurrency=int(os.environ.get("VERIFY_CONCURRENCY", "") or 8),
+            per_host_rps=float(os.environ.get("VERIFY_HOST_RPS", "") or 5),
+            budget_seconds=float(os.environ.get("VERIFY_BUDGET_SECONDS", "") or 60),
+            timeout_seconds=float(os.environ.get("VERIFY_TIMEOUT", "") or 10),
+        )
+
+    def _throttle(self, host: str, deadline: float) -> bool:
+        # Reserva el siguiente turno del host; si cae fuera del presupuesto no espera ni lo reserva.
+        if self.per_host_rps <= 0:
+            return time.monotonic() < deadline
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            if slot >= deadline:
+                return False
+            self._next_slot[host] = slot + 1 / self.per_host_rps
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+    def _connection(self, scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+        # Una conexión keep-alive por hilo y host.
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+        conn = pool.get((scheme, netloc))
+        if conn is None:
+            conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conn_cls(netloc, timeout=timeout)
+            pool[(scheme, netloc)] = conn
+            with self._lock:
+                self._connections.append(conn)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        conn = self._local.pool.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def _http_target(url: str) -> tuple[str, str, str]:
+        # http.client solo acepta ASCII: host en IDNA y ruta/query con percent-encoding (sin tocar los %XX existentes).
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").encode("idna").decode("ascii")
+        if ":" in host:
+            host = f"[{host}]"
+        netloc = host if parsed.port is None else f"{host}:{parsed.port}"
+        target = quote(parsed.path or "/", safe="/%:@!$&'()*+,;=~")
+        if parsed.query:
+            target += "?" + quote(parsed.query, safe="/%?=&;:@!$'()*+,~")
+        return parsed.scheme, netloc, target
+
+    def _request(self, method: str, url: str, timeout: float) -> tuple[int, str | None]:
+        scheme, netloc, target = self._http_target(url)
+        for attempt in (1, 2):
+            conn = self._connection(scheme, netloc, timeout)
+            reused = conn.sock is not None
+            try:
+                conn.request(
+                    method,
+                    target,
+                    headers={"User-Agent": "claro-sitemaps-bot/1.0 (+https://github.com/)", "Accept": "*/*"},
+                )
+                resp = conn.getresponse()
+                if method == "HEAD":
+                    resp.read()
+                else:
+                    # No se descarga el cuerpo del GET: se descarta la conexión.
+                    resp.close()
+                    self._drop_connection(scheme, netloc)
+                if resp.will_close:
+                    self._drop_connection(scheme, netloc)
+                return resp.status, resp.getheader("Location")
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine):
+                self._drop_connection(scheme, netloc)
+                # Una conexión keep-alive reutilizada puede haber sido cerrada por el servidor.
+                if attempt == 1 and reused:
+                    continue
+                raise
+            except (OSError, http.client.HTTPException):
+                self._drop_connection(scheme, netloc)
+                raise
+        raise RuntimeError(f"Unreachable: {url}")
+
+    def _check(self, entry: dict, deadline: float) -> None:
+        url = str(entry.get("url", ""))
+        entry["status"] = None
+        entry["redirect_to"] = None
+        entry["latency_ms"] = None
+
+        host = urlparse(url).netloc
+        if not self._throttle(host, deadline) or time.monotonic() >= deadline:
+            entry["verify_error"] = "budget_exceeded"
+            return
+        remaining = deadline - time.monotonic()
+
+        started = time.monotonic()
+        try:
+            status, location = self._request("HEAD", url, min(self.timeout_seconds, remaining))
+            if status in (405, 501):
+                if not self._throttle(host, deadline) or time.monotonic() >= deadline:
+                    entry["verify_error"] = "budget_exceeded"
+                    return
+                remaining = deadline - time.monotonic()
+                started = time.monotonic()
+                status, location = self._request("GET", url, min(self.timeout_seconds, remaining))
+        except Exception as e:
+            entry["verify_error"] = str(e) or type(e).__name__
+            return
+
+        entry["status"] = status
+        entry["latency_ms"] = int((time.monotonic() - started) * 1000)
+        if 300 <= status < 400 and location:
+            entry["redirect_to"] = urljoin(url, location)
+
+    def run(self, entries: list[dict]) -> dict:
+        started = time.monotonic()
+        deadline = started + self.budget_seconds
+        try:
+            if entries:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(entries))) as pool:
+                    list(pool.map(lambda entry: self._check(entry, deadline), entries))
+        finally:
+            with self._lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections.clear()
+
+        stats = {"checked": 0, "2xx": 0, "3xx": 0, "4xx": 0, "5xx": 0, "errors": 0, "skipped": 0}
+        for entry in entries:
+            status = entry.get("status")
+            if status is None:
+                stats["skipped" if entry.get("verify_error") == "budget_exceeded" else "errors"] += 1
+                continue
+            stats["checked"] += 1
+            bucket = f"{status // 100}xx"
+            if bucket in stats:
+                stats[bucket] += 1
+        stats["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+        return stats
+
+
+def render_verify_cells(item: dict) -> str:
+    # Celdas de la tabla del correo para VERIFY_TABLE_HEADERS.
+    status = item.get("status")
+    if status is None:
+        status_str = html_lib.escape(str(item.get("verify_error") or ""))
+    else:
+        status_str = str(status)
+    redirect_to = item.get("redirect_to")
+    redirect_str = "" if not redirect_to else html_lib.escape(str(redirect_to))
+    latency_ms = item.get("latency_ms")
+    latency_str = "" if latency_ms is None else str(latency_ms)
+    return (
+        f"<td style=\"padding:8px;border:1px solid #ddd;white-space:nowrap;\">{status_str}</td>"
+        f"<td style=\"padding:8px;border:1px solid #ddd;\">{redirect_str}</td>"
+        f"<td style=\"padding:8px;border:1px solid #ddd;white-space:nowrap;text-align:right;\">{latency_str}</td>"
+    )
+
+
+def compute_etag(payload: dict) -> str:
+    # Los campos de tiempo cambian en cada request; se excluyen para que el ETag dependa solo del reporte.
+    stable = {k: v for k, v in payload.items() if k not in ETAG_EXCLUDED_KEYS}
+    entries = stable.get("urls_to_delete")
+    if isinstance(entries, list):
+        stable["urls_to_delete"] = [
+            {k: v for k, v in entry.items() if k not in ETAG_EXCLUDED_ENTRY_KEYS} if isinstance(entry, dict) else entry
+            for entry in entries
+        ]
+    canonical = json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    qvalues: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qvalues[coding] = q
+    # Una entrada explícita "gzip" tiene prioridad sobre "*".
+    if "gzip" in qvalues:
+        return qvalues["gzip"] > 0
+    return qvalues.get("*", 0.0) > 0
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    for candidate in (if_none_match or "").split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def send_json_response(
+    handler: BaseHTTPRequestHandler, payload: dict, status_code: int = 200, etag: bool = True
+) -> None:
+    qs = parse_qs(urlparse(handler.path).query)
+    compact = bool(parse_flag(qs.get("compact", [""])[0]))
+    if compact:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
+    use_gzip = len(body) >= GZIP_MIN_BYTES and _accepts_gzip(handler.headers.get("Accept-Encoding"))
+
+    # etag=False para endpoints con efectos secundarios (p. ej. /send-report): nunca deben responder 304.
+    etag_header = None
+    if etag and status_code == 200:
+        variant = ("c" if compact else "p") + ("-gz" if use_gzip else "")
+        etag_header = f'"{compute_etag(payload)}-{variant}"'
+        if _etag_matches(handler.headers.get("If-None-Match"), etag_header):
+            handler.send_response(304)
+            handler.send_header("ETag", etag_header)
+            handler.send_header("Vary", "Accept-Encoding")
+            handler.end_headers()
+            return
+
+    if use_gzip:
+        body = gzip.compress(body, compresslevel=6, mtime=0)
+
+    handler.send_response(status_code)
+    handler.send_header("Content-Type", "application/json; charset=utf-8")
+    handler.send_header("Vary", "Accept-Encoding")
+    if use_gzip:
+        handler.send_header("Content-Encoding", "gzip")
+    if etag_header:
+        handler.send_header("ETag", etag_header)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
 class Handler(BaseHTTPRequestHandler):
     server_version = "claro-sitemaps/1.0"
 
     def _send_json(self, payload: dict, status_code: int = 200) -> None:
-        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        send_json_response(self, payload, status_code=status_code)
 
     def do_GET(self):
         parsed = urlparse(self.path)
@@ -168,11 +801,19 @@ class Handler(BaseHTTPRequestHandler):
             self._send_json({"status": "ok"})
             return
 
+        if path == "/urls-shard":
+            self._handle_shard(qs.get("sitemap", []), parse_flag(qs.get("hedge", [""])[0]))
+            return
+
+        if path.startswith("/index/"):
+            self._handle_index(path, qs)
+            return
+
         if path != "/urls-a-eliminar":
             self._send_json(
                 {
                     "error": "not_found",
-                    "message": "Use /urls-a-eliminar or /health",
+                    "message": "Use /urls-a-eliminar, /urls-shard, /index/runs, /index/url, /index/urls or /health",
                 },
                 status_code=404,
             )
@@ -186,10 +827,33 @@ class Handler(BaseHTTPRequestHandler):
             suffixes_from_env = os.environ.get("SUFFIXES", "")
             suffixes = _parse_suffixes_csv(suffixes_from_env) or DEFAULT_SUFFIXES
 
+        try:
+            shards = parse_shards(qs.get("shards", [""])[0])
+        except ValueError as e:
+            self._send_json({"error": "invalid_shards", "message": str(e)}, status_code=400)
+            return
+
+        # El coordinador envía CRON_SECRET a los shards: si está definido, hay que presentarlo.
+        if shards > 1 and os.environ.get("CRON_SECRET", "").strip() and not has_cron_secret(qs, self.headers):
+            self._send_json({"error": "unauthorized", "message": "shards > 1 requires the cron secret"}, status_code=401)
+            return
+
+        verify = bool(parse_flag(qs.get("verify", [""])[0]))
+        started_at = url_index.utc_now()
         started = time.time()
         try:
-            urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url)
+            policy = FetchPolicy.from_env(hedge=parse_flag(qs.get("hedge", [""])[0]))
+            if shards > 1:
+                urls_by_loc = fetch_all_urls_sharded(
+                    sitemap_url,
+                    resolve_shard_endpoint(f"http://127.0.0.1:{self.server.server_address[1]}/urls-shard"),
+                    shards,
+                    policy=policy,
+                )
+            else:
+                urls_by_loc = fetch_all_urls_from_sitemap(sitemap_url, policy=policy)
             to_delete = find_urls_to_delete(urls_by_loc, suffixes=suffixes)
+            verify_stats = UrlVerifier.from_env().run(to_delete) if verify else None
         except urllib.error.URLError as e:
             self._send_json(
                 {
@@ -211,17 +875,143 @@ class Handler(BaseHTTPRequestHandler):
             )
             return
 
+        # El índice es opcional: si SQLite falla, el reporte se devuelve igual.
+        # Solo se indexan los crawls con los sufijos configurados, para que `matches` no cambie con consultas ad hoc.
+        index_error = None
+        index_db = url_index.index_path_from_env()
+        if index_db and tuple(suffixes) == configured_suffixes():
+            try:
+                url_index.save_crawl(index_db, sitemap_url, suffixes, urls_by_loc, to_delete, started_at=started_at)
+            except sqlite3.Error as e:
+                index_error = str(e)
+
         elapsed_ms = int((time.time() - started) * 1000)
-        self._send_json(
-            {
-                "sitemap": sitemap_url,
-                "suffixes": list(suffixes),
-                "total_urls": len(urls_by_loc),
-                "urls_to_delete": to_delete,
-                "count": len(to_delete),
-                "elapsed_ms": elapsed_ms,
-            }
-        )
+        report = {
+            "sitemap": sitemap_url,
+            "suffixes": list(suffixes),
+            "total_urls": len(urls_by_loc),
+            "urls_to_delete": to_delete,
+            "count": len(to_delete),
+            "shards": shards,
+            "fetch_stats": policy.stats(),
+            "elapsed_ms": elapsed_ms,
+        }
+        if verify_stats is not None:
+            report["verify_stats"] = verify_stats
+        if index_error is not None:
+            report["index_error"] = index_error
+        self._send_json(report)
+
+    def _handle_index(self, path: str, qs: dict) -> None:
+        index_db = url_index.index_path_from_env()
+        if not index_db:
+            self._send_json(
+                {"error": "index_disabled", "message": "Set URL_INDEX_DB to enable the URL index"},
+                status_code=404,
+            )
+            return
+
+        try:
+            limit = int(qs.get("limit", ["0"])[0] or 0)
+            if limit < 0:
+                raise ValueError
+        except ValueError:
+            self._send_json(
+                {"error": "invalid_limit", "message": "limit must be a non-negative integer"}, status_code=400
+            )
+            return
+
+        started = time.time()
+        try:
+            payload = self._query_index(index_db, path, qs, limit)
+        except sqlite3.Error as e:
+            self._send_json({"error": "index_unavailable", "message": str(e)}, status_code=503)
+            return
+        if payload is None:
+            return
+
+        payload["elapsed_ms"] = int((time.time() - started) * 1000)
+        self._send_json(payload)
+
+    def _query_index(self, index_db: str, path: str, qs: dict, limit: int) -> dict | None:
+        conn = url_index.open_index(index_db)
+        try:
+            if path == "/index/runs":
+                runs = url_index.list_runs(
+                    conn,
+                    sitemap_url=qs.get("sitemap", [""])[0] or None,
+                    since=qs.get("since", [""])[0] or None,
+                    until=qs.get("until", [""])[0] or None,
+                    limit=limit or 50,
+                )
+                payload = {"runs": runs, "count": len(runs)}
+            elif path == "/index/url":
+                url = qs.get("url", [""])[0].strip()
+                if not url:
+                    self._send_json({"error": "missing_url", "message": "Use /index/url?url=..."}, status_code=400)
+                    return None
+                history = url_index.get_url_history(conn, qs.get("sitemap", [DEFAULT_SITEMAP_URL])[0], url)
+                if history is None:
+                    self._send_json({"error": "not_indexed", "url": url}, status_code=404)
+                    return None
+                payload = history
+            elif path == "/index/urls":
+                urls = url_index.list_urls(
+                    conn,
+                    qs.get("sitemap", [DEFAULT_SITEMAP_URL])[0],
+                    path_prefix=qs.get("path", [""])[0] or None,
+                    matches=parse_flag(qs.get("matches", [""])[0]),
+                    first_seen_since=qs.get("first_seen_since", [""])[0] or None,
+                    lastmod_since=qs.get("lastmod_since", [""])[0] or None,
+                    limit=limit or 500,
+                )
+                payload = {"urls": urls, "count": len(urls)}
+            else:
+                self._send_json(
+                    {"error": "not_found", "message": "Use /index/runs, /index/url or /index/urls"},
+                    status_code=404,
+                )
+                return None
+        finally:
+            conn.close()
+        return payload
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path != "/urls-shard":
+            self._send_json({"error": "not_found", "message": "POST is only supported on /urls-shard"}, status_code=404)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Body must be a JSON object with a 'sitemaps' list")
+            sitemap_urls = payload.get("sitemaps")
+            if not isinstance(sitemap_urls, list):
+                raise ValueError("Body must be a JSON object with a 'sitemaps' list")
+        except ValueError as e:
+            self._send_json({"error": "invalid_body", "message": str(e)}, status_code=400)
+            return
+
+        self._handle_shard(sitemap_urls, parse_flag(payload.get("hedge")))
+
+    def _handle_shard(self, sitemap_urls: list[str], hedge: bool | None = None) -> None:
+        sitemap_urls = [str(u).strip() for u in sitemap_urls if str(u).strip()]
+        if not sitemap_urls:
+            self._send_json({"error": "invalid_body", "message": "No sitemaps provided"}, status_code=400)
+            return
+
+        try:
+            result = run_shard(sitemap_urls, policy=FetchPolicy.from_env(hedge=hedge))
+        except urllib.error.URLError as e:
+            self._send_json({"error": "fetch_failed", "message": str(e), "sitemaps": sitemap_urls}, status_code=502)
+            return
+        except Exception as e:
+            self._send_json({"error": "processing_failed", "message": str(e), "sitemaps": sitemap_urls}, status_code=500)
+            return
+
+        self._send_json(result)
 
     def log_message(self, format, *args):
         return
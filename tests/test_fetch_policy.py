@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from server import FetchPolicy, Handler, fetch_all_urls_from_sitemap
+from tests.standin import StandInHandler, StandInTestCase
+
+URLSET = (
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    b"<url><loc>https://www.claro.com.pe/planes_bkp/</loc><lastmod>2025-01-01</lastmod></url>"
+    b"</urlset>"
+)
+
+
+class _StandIn(StandInHandler):
+    # Rutas: /fail/<n>/<status>/... falla n veces con <status>; /slow/<n>/<segundos>/... tarda en los n primeros hits;
+    # /retry-after/<valor>/... responde 503 con Retry-After una vez.
+    hits: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            n = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        parts = self.path.strip("/").split("/")
+
+        if parts[0] == "fail" and n <= int(parts[1]):
+            self._empty(int(parts[2]))
+            return
+        if parts[0] == "retry-after" and n == 1:
+            self._empty(503, {"Retry-After": parts[1]})
+            return
+        if parts[0] == "slow" and n <= int(parts[1]):
+            time.sleep(float(parts[2]))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(URLSET)))
+        self.end_headers()
+        self.wfile.write(URLSET)
+
+
+class FetchPolicyTest(StandInTestCase):
+    handler_class = _StandIn
+
+    def _policy(self, **kwargs) -> FetchPolicy:
+        kwargs.setdefault("backoff_base_seconds", 0.01)
+        return FetchPolicy(**kwargs)
+
+    def test_retries_retryable_status_then_succeeds(self):
+        policy = self._policy(max_retries=3)
+        urls = fetch_all_urls_from_sitemap(f"{self.base}/fail/2/503/a.xml", policy=policy)
+
+        self.assertEqual(urls, {"https://www.claro.com.pe/planes_bkp/": "2025-01-01"})
+        stats = policy.stats()
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["attempts"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["failures"], 0)
+
+    def test_gives_up_after_max_retries(self):
+        policy = self._policy(max_retries=2)
+        with self.assertRaises(urllib.error.HTTPError):
+            policy.get(f"{self.base}/fail/99/503/b.xml")
+
+        stats = policy.stats()
+        self.assertEqual(stats["attempts"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["failures"], 1)
+
+    def test_does_not_retry_non_retryable_status(self):
+        policy = self._policy(max_retries=3)
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            policy.get(f"{self.base}/fail/99/404/c.xml")
+
+        self.assertEqual(ctx.exception.code, 404)
+        stats = policy.stats()
+        self.assertEqual(stats["attempts"], 1)
+        self.assertEqual(stats["retries"], 0)
+        self.assertEqual(stats["failures"], 1)
+
+    def test_honors_retry_after(self):
+        policy = self._policy(max_retries=1, backoff_max_seconds=0.01)
+        started = time.monotonic()
+        policy.get(f"{self.base}/retry-after/1/d.xml")
+        elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.9)
+        self.assertEqual(policy.stats()["retry_after_honored"], 1)
+
+    def test_caps_retry_after(self):
+        policy = self._policy(max_retries=1, retry_after_max_seconds=0.1)
+        started = time.monotonic()
+        policy.get(f"{self.base}/retry-after/30/e.xml")
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(policy.stats()["retry_after_honored"], 1)
+
+    def test_retries_after_attempt_timeout(self):
+        policy = self._policy(attempt_timeout_seconds=0.3, max_retries=1)
+        started = time.monotonic()
+        policy.get(f"{self.base}/slow/1/1.5/f.xml")
+
+        self.assertLess(time.monotonic() - started, 1.2)
+        stats = policy.stats()
+        self.assertEqual(stats["attempts"], 2)
+        self.assertEqual(stats["retries"], 1)
+
+    def test_hedged_request_wins_over_stalled_attempt(self):
+        policy = self._policy(hedge=True, hedge_min_samples=5, hedge_min_delay_seconds=0.05)
+        for i in range(5):
+            policy.get(f"{self.base}/warmup/{i}.xml")
+        self.assertEqual(policy.stats()["hedges"], 0)
+
+        started = time.monotonic()
+        policy.get(f"{self.base}/slow/1/2/g.xml")
+
+        self.assertLess(time.monotonic() - started, 1)
+        stats = policy.stats()
+        self.assertEqual(stats["hedges"], 1)
+        self.assertEqual(stats["hedge_wins"], 1)
+        self.assertIsNotNone(stats["p95_ms"])
+
+    def test_no_hedge_before_enough_samples(self):
+        policy = self._policy(hedge=True, hedge_min_samples=5, hedge_min_delay_seconds=0.01)
+        policy.get(f"{self.base}/slow/1/0.3/h.xml")
+
+        self.assertEqual(policy.stats()["hedges"], 0)
+
+    def test_merge_stats_sums_counters(self):
+        policy = self._policy()
+        policy.get(f"{self.base}/i.xml")
+        policy.merge_stats({"requests": 4, "attempts": 6, "retries": 2, "hedges": 1, "p95_ms": 40, "unknown": 3})
+        policy.merge_stats(None)
+
+        stats = policy.stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["attempts"], 7)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["hedges"], 1)
+        self.assertNotIn("unknown", stats)
+
+
+
+class FetchPolicyFromEnvTest(StandInTestCase):
+    handler_class = Handler
+
+    def test_invalid_env_returns_json_error(self):
+        with mock.patch.dict(os.environ, {"FETCH_MAX_RETRIES": "tres"}):
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(f"{self.base}/urls-a-eliminar?sitemap={self.base}/x.xml", timeout=10)
+
+        self.assertEqual(ctx.exception.code, 500)
+        self.assertEqual(json.loads(ctx.exception.read().decode("utf-8"))["error"], "processing_failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import gzip
+import http.client
+import json
+import unittest
+
+from server import GZIP_MIN_BYTES, _accepts_gzip, _etag_matches, compute_etag, send_json_response
+from tests.standin import StandInHandler, StandInTestCase
+
+SMALL = {"status": "ok"}
+BIG = {
+    "sitemap": "https://www.claro.com.pe/sitemap.xml",
+    "urls_to_delete": [{"url": f"https://www.claro.com.pe/pagina-{i}_1/", "ultima_actualizacion": None} for i in range(50)],
+    "count": 50,
+}
+
+
+class _Responses(StandInHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/small":
+            send_json_response(self, SMALL)
+        elif path == "/big":
+            send_json_response(self, BIG)
+        elif path == "/side-effect":
+            send_json_response(self, BIG, etag=False)
+        else:
+            send_json_response(self, {"error": "not_found"}, status_code=404)
+
+
+class AcceptsGzipTest(unittest.TestCase):
+    def test_accepts(self):
+        for value in ("gzip", "gzip, deflate", "deflate;q=0.5, gzip;q=0.8", "*", "*;q=0.1", "GZIP", "*;q=0, gzip"):
+            with self.subTest(value=value):
+                self.assertTrue(_accepts_gzip(value))
+
+    def test_rejects(self):
+        for value in (None, "", "deflate", "br", "gzip;q=0", "*;q=0", "gzip;q=0, *", "gzip;q=abc"):
+            with self.subTest(value=value):
+                self.assertFalse(_accepts_gzip(value))
+
+
+class EtagMatchesTest(unittest.TestCase):
+    def test_matches(self):
+        self.assertTrue(_etag_matches('"abc-p"', '"abc-p"'))
+        self.assertTrue(_etag_matches('"x", "abc-p"', '"abc-p"'))
+        self.assertTrue(_etag_matches('W/"abc-p"', '"abc-p"'))
+        self.assertTrue(_etag_matches("*", '"abc-p"'))
+
+    def test_does_not_match(self):
+        self.assertFalse(_etag_matches(None, '"abc-p"'))
+        self.assertFalse(_etag_matches("", '"abc-p"'))
+        self.assertFalse(_etag_matches('"abc-c"', '"abc-p"'))
+
+
+class ComputeEtagTest(unittest.TestCase):
+    def test_ignores_timing_fields(self):
+        a = dict(BIG, elapsed_ms=10, fetch_stats={"requests": 1}, verify_stats={"checked": 1})
+        b = dict(BIG, elapsed_ms=99, fetch_stats={"requests": 7})
+        self.assertEqual(compute_etag(a), compute_etag(b))
+        self.assertNotEqual(compute_etag(BIG), compute_etag(dict(BIG, count=51)))
+
+    def test_ignores_latency(self):
+        report = {"sitemap": "s", "urls_to_delete": [{"url": "u", "status": 200, "latency_ms": 12}], "count": 1}
+        same = {"sitemap": "s", "urls_to_delete": [{"url": "u", "status": 200, "latency_ms": 80}], "count": 1}
+        changed = {"sitemap": "s", "urls_to_delete": [{"url": "u", "status": 404, "latency_ms": 12}], "count": 1}
+
+        self.assertEqual(compute_etag(report), compute_etag(same))
+        self.assertNotEqual(compute_etag(report), compute_etag(changed))
+
+
+class SendJsonResponseTest(StandInTestCase):
+    handler_class = _Responses
+
+    def _get(self, path: str, headers: dict | None = None) -> http.client.HTTPResponse:
+        conn = http.client.HTTPConnection(self.base.split("//", 1)[1], timeout=10)
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        resp.body = resp.read()
+        conn.close()
+        return resp
+
+    def test_small_body_is_not_gzipped(self):
+        resp = self._get("/small", {"Accept-Encoding": "gzip"})
+
+        self.assertLess(len(resp.body), GZIP_MIN_BYTES)
+        self.assertIsNone(resp.getheader("Content-Encoding"))
+        self.assertEqual(json.loads(resp.body), SMALL)
+
+    def test_big_body_is_gzipped_when_accepted(self):
+        plain = self._get("/big")
+        gzipped = self._get("/big", {"Accept-Encoding": "gzip"})
+
+        self.assertIsNone(plain.getheader("Content-Encoding"))
+        self.assertEqual(gzipped.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(gzipped.getheader("Vary"), "Accept-Encoding")
+        self.assertLess(len(gzipped.body), len(plain.body))
+        self.assertEqual(json.loads(gzip.decompress(gzipped.body)), BIG)
+
+    def test_compact(self):
+        pretty = self._get("/big")
+        compact = self._get("/big?compact=1")
+
+        self.assertNotIn(b"\n", compact.body)
+        self.assertLess(len(compact.body), len(pretty.body))
+        self.assertEqual(json.loads(compact.body), BIG)
+
+    def test_not_modified_on_matching_etag(self):
+        first = self._get("/big?compact=1", {"Accept-Encoding": "gzip"})
+        etag = first.getheader("ETag")
+        second = self._get("/big?compact=1", {"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+        self.assertEqual(second.status, 304)
+        self.assertEqual(second.body, b"")
+        self.assertEqual(second.getheader("ETag"), etag)
+
+    def test_etag_differs_per_variant(self):
+        etags = {
+            self._get(path, headers).getheader("ETag")
+            for path in ("/big", "/big?compact=1")
+            for headers in ({}, {"Accept-Encoding": "gzip"})
+        }
+        self.assertEqual(len(etags), 4)
+
+        stale = self._get("/big", {"If-None-Match": self._get("/big?compact=1").getheader("ETag")})
+        self.assertEqual(stale.status, 200)
+
+    def test_no_validators_when_disabled(self):
+        resp = self._get("/side-effect", {"If-None-Match": "*"})
+
+        self.assertEqual(resp.status, 200)
+        self.assertIsNone(resp.getheader("ETag"))
+        self.assertEqual(json.loads(resp.body), BIG)
+
+    def test_errors_have_no_etag(self):
+        resp = self._get("/missing", {"If-None-Match": "*"})
+
+        self.assertEqual(resp.status, 404)
+        self.assertIsNone(resp.getheader("ETag"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import gzip
+import json
+import os
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from server import (
+    FetchPolicy,
+    Handler,
+    _dispatch_shard,
+    fetch_all_urls_from_sitemap,
+    fetch_all_urls_sharded,
+    partition_sitemaps,
+)
+from tests.standin import StandInHandler, start_server, stop_server
+
+NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+CHILDREN = 5
+
+
+def _urlset(urls: list[tuple[str, str | None]]) -> bytes:
+    items = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+        for loc, lastmod in urls
+    )
+    return f'<urlset xmlns="{NS}">{items}</urlset>'.encode("utf-8")
+
+
+def _child_urls(i: int) -> list[tuple[str, str | None]]:
+    # Cada hijo repite la URL compartida con otro lastmod: gana la del primer hijo.
+    urls = [("https://www.claro.com.pe/compartida_1/", f"2025-0{i + 1}-01")]
+    urls += [(f"https://www.claro.com.pe/s{i}/pagina-{j}{'_bkp' if j % 2 else ''}/", None) for j in range(30)]
+    return urls
+
+
+class _Sitemaps(StandInHandler):
+    lock = threading.Lock()
+    hits: dict[str, int] = {}
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        base = f"http://{self.headers['Host']}"
+        if self.path == "/index.xml":
+            locs = "".join(f"<sitemap><loc>{base}/s{i}.xml</loc></sitemap>" for i in range(CHILDREN))
+            body = f'<sitemapindex xmlns="{NS}">{locs}</sitemapindex>'.encode("utf-8")
+        elif self.path == "/urlset.xml":
+            body = _urlset(_child_urls(0))
+        elif self.path.startswith("/s"):
+            body = _urlset(_child_urls(int(self.path[2:-4])))
+        else:
+            self._empty(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _FakeShard(StandInHandler):
+    # Responde lo que indique la ruta: /gzip (JSON válido comprimido), /list ([]), /no-urls ({}).
+    secrets: list[str | None] = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.secrets.append(self.headers.get("X-Cron-Secret"))
+        path = self.path.split("?", 1)[0]
+        headers = {}
+        if path == "/gzip":
+            body = gzip.compress(json.dumps({"urls": [["https://x.pe/a_1/", "2025-01-01"]]}).encode("utf-8"))
+            headers["Content-Encoding"] = "gzip"
+        elif path == "/list":
+            body = b"[]"
+        else:
+            body = b"{}"
+        self.send_response(200)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PartitionSitemapsTest(unittest.TestCase):
+    def test_contiguous_blocks_preserve_order(self):
+        urls = [f"s{i}" for i in range(7)]
+        parts = partition_sitemaps(urls, 3)
+
+        self.assertEqual(parts, [["s0", "s1", "s2"], ["s3", "s4"], ["s5", "s6"]])
+        self.assertEqual([u for part in parts for u in part], urls)
+
+    def test_more_shards_than_sitemaps(self):
+        self.assertEqual(partition_sitemaps(["a", "b"], 10), [["a"], ["b"]])
+
+    def test_single_shard(self):
+        self.assertEqual(partition_sitemaps(["a", "b", "c"], 1), [["a", "b", "c"]])
+
+
+class ShardedCrawlTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.env = mock.patch.dict(os.environ)
+        cls.env.start()
+        for name in ("CRON_SECRET", "SHARD_ENDPOINT", "URL_INDEX_DB", "FETCH_HEDGE"):
+            os.environ.pop(name, None)
+        cls.sitemaps, cls.sitemaps_base = start_server(_Sitemaps)
+        cls.app, cls.app_base = start_server(Handler)
+        cls.fake, cls.fake_base = start_server(_FakeShard)
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in (cls.sitemaps, cls.app, cls.fake):
+            stop_server(server)
+        cls.env.stop()
+
+    def setUp(self):
+        _Sitemaps.hits.clear()
+        _FakeShard.secrets.clear()
+
+    def _get_json(self, path: str, headers: dict | None = None) -> tuple[int, dict]:
+        req = urllib.request.Request(f"{self.app_base}{path}", headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                return resp.status, json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read().decode("utf-8"))
+
+    def test_sharded_matches_unsharded(self):
+        root = f"{self.sitemaps_base}/index.xml"
+        expected = fetch_all_urls_from_sitemap(root)
+
+        for shards in (2, 3, CHILDREN, 10):
+            with self.subTest(shards=shards):
+                sharded = fetch_all_urls_sharded(root, f"{self.app_base}/urls-shard", shards)
+                self.assertEqual(list(sharded.items()), list(expected.items()))
+
+        self.assertEqual(expected["https://www.claro.com.pe/compartida_1/"], "2025-01-01")
+
+    def test_endpoint_results_match(self):
+        root = f"{self.sitemaps_base}/index.xml"
+        status, plain = self._get_json(f"/urls-a-eliminar?sitemap={root}")
+        self.assertEqual(status, 200)
+        status, sharded = self._get_json(f"/urls-a-eliminar?sitemap={root}&shards=3")
+        self.assertEqual(status, 200)
+
+        self.assertEqual(sharded["urls_to_delete"], plain["urls_to_delete"])
+        self.assertEqual(sharded["total_urls"], plain["total_urls"])
+        self.assertEqual(sharded["fetch_stats"]["requests"], CHILDREN + 1)
+
+    def test_urlset_root_is_fetched_once(self):
+        policy = FetchPolicy()
+        urls = fetch_all_urls_sharded(f"{self.sitemaps_base}/urlset.xml", f"{self.app_base}/urls-shard", 4, policy=policy)
+
+        self.assertEqual(len(urls), 31)
+        self.assertEqual(_Sitemaps.hits["/urlset.xml"], 1)
+        self.assertEqual(policy.stats()["requests"], 1)
+
+    def test_dispatch_decodes_gzip(self):
+        payload = _dispatch_shard(f"{self.fake_base}/gzip", ["s0"], 10, False)
+        self.assertEqual(payload["urls"], [["https://x.pe/a_1/", "2025-01-01"]])
+
+    def test_dispatch_rejects_invalid_response(self):
+        for path in ("/list", "/no-urls"):
+            with self.subTest(path=path), self.assertRaises(RuntimeError):
+                _dispatch_shard(f"{self.fake_base}{path}", ["s0"], 10, False)
+
+    def test_coordinator_requires_cron_secret_when_configured(self):
+        root = f"{self.sitemaps_base}/index.xml"
+        with mock.patch.dict(os.environ, {"CRON_SECRET": "s3cret", "SHARD_ENDPOINT": f"{self.fake_base}/gzip"}):
+            status, body = self._get_json(f"/urls-a-eliminar?sitemap={root}&shards=2")
+            self.assertEqual(status, 401)
+            self.assertEqual(body["error"], "unauthorized")
+            self.assertEqual(_FakeShard.secrets, [])
+
+            status, _ = self._get_json(f"/urls-a-eliminar?sitemap={root}&shards=2", {"X-Cron-Secret": "s3cret"})
+            self.assertEqual(status, 200)
+            self.assertEqual(_FakeShard.secrets, ["s3cret", "s3cret"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+
+import url_index
+from server import Handler
+from tests.standin import StandInHandler, start_server, stop_server
+
+SITEMAP = "https://www.claro.com.pe/sitemap.xml"
+OTHER_SITEMAP = "https://otro.example/sitemap.xml"
+
+
+def _crawl(urls: dict[str, str | None], flagged: list[str]) -> tuple[dict, list[dict]]:
+    return urls, [{"url": u, "ultima_actualizacion": urls[u]} for u in flagged]
+
+
+class UrlIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = url_index.open_index(os.path.join(self.tmp.name, "urls.db"))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _record(self, urls, flagged, started_at, sitemap=SITEMAP):
+        urls_by_loc, to_delete = _crawl(urls, flagged)
+        return url_index.record_crawl(self.conn, sitemap, ("_bkp",), urls_by_loc, to_delete, started_at=started_at)
+
+    def test_uses_wal(self):
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_second_run_keeps_first_seen_and_advances_last_seen(self):
+        bkp = "https://www.claro.com.pe/planes_bkp/"
+        self._record({bkp: "2025-01-01"}, [bkp], "2026-09-01T10:00:00+00:00")
+        self._record({bkp: "2025-02-01"}, [bkp], "2026-10-01T10:00:00+00:00")
+
+        history = url_index.get_url_history(self.conn, SITEMAP, bkp)
+        self.assertEqual(history["first_seen_at"], "2026-09-01T10:00:00+00:00")
+        self.assertEqual(history["last_seen_at"], "2026-10-01T10:00:00+00:00")
+        self.assertEqual(history["lastmod"], "2025-02-01")
+        self.assertTrue(history["matches"])
+        self.assertEqual(history["runs_seen"], 2)
+        self.assertEqual([h["lastmod"] for h in history["history"]], ["2025-01-01", "2025-02-01"])
+
+    def test_run_urls_has_one_row_per_url_and_run(self):
+        urls = {f"https://www.claro.com.pe/p{i}/": None for i in range(3)}
+        run_1 = self._record(urls, [], "2026-09-01T10:00:00+00:00")
+        run_2 = self._record(urls, [], "2026-09-02T10:00:00+00:00")
+
+        counts = dict(self.conn.execute("SELECT run_id, COUNT(*) FROM run_urls GROUP BY run_id").fetchall())
+        self.assertEqual(counts, {run_1: 3, run_2: 3})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0], 3)
+
+    def test_urls_are_scoped_by_sitemap(self):
+        url = "https://www.claro.com.pe/planes_bkp/"
+        self._record({url: "2025-01-01"}, [url], "2026-09-01T10:00:00+00:00")
+        self._record({url: None}, [], "2026-10-01T10:00:00+00:00", sitemap=OTHER_SITEMAP)
+
+        history = url_index.get_url_history(self.conn, SITEMAP, url)
+        self.assertTrue(history["matches"])
+        self.assertEqual(history["last_seen_at"], "2026-09-01T10:00:00+00:00")
+        self.assertEqual([u["url"] for u in url_index.list_urls(self.conn, SITEMAP)], [url])
+        self.assertEqual(url_index.list_urls(self.conn, OTHER_SITEMAP)[0]["matches"], False)
+
+    def test_list_runs_until_is_a_date_prefix(self):
+        for started_at in ("2026-09-15T10:00:00+00:00", "2026-09-30T23:59:00+00:00", "2026-10-01T00:00:00+00:00"):
+            self._record({}, [], started_at)
+
+        def started(**kwargs):
+            return [r["started_at"][:10] for r in url_index.list_runs(self.conn, **kwargs)]
+
+        self.assertEqual(started(until="2026-09-30"), ["2026-09-30", "2026-09-15"])
+        self.assertEqual(started(until="2026-09"), ["2026-09-30", "2026-09-15"])
+        self.assertEqual(started(since="2026-09-30"), ["2026-10-01", "2026-09-30"])
+        self.assertEqual(started(until="2026-09-30", limit=1), ["2026-09-30"])
+        self.assertEqual(started(sitemap_url=OTHER_SITEMAP), [])
+
+    def test_list_urls_path_range_and_filters(self):
+        urls = {
+            "https://www.claro.com.pe/planes/postpago/": "2025-01-01",
+            "https://www.claro.com.pe/planes/prepago_bkp/": "2025-06-01",
+            "https://www.claro.com.pe/planes-hogar/": "2025-03-01",
+            "https://www.claro.com.pe/ofertas/": None,
+        }
+        self._record(urls, ["https://www.claro.com.pe/planes/prepago_bkp/"], "2026-09-01T10:00:00+00:00")
+
+        def paths(**kwargs):
+            return sorted(u["path"] for u in url_index.list_urls(self.conn, SITEMAP, **kwargs))
+
+        self.assertEqual(paths(path_prefix="/planes/"), ["/planes/postpago/", "/planes/prepago_bkp/"])
+        self.assertEqual(paths(path_prefix="/planes"), ["/planes-hogar/", "/planes/postpago/", "/planes/prepago_bkp/"])
+        self.assertEqual(paths(matches=True), ["/planes/prepago_bkp/"])
+        self.assertEqual(paths(lastmod_since="2025-03-01"), ["/planes-hogar/", "/planes/prepago_bkp/"])
+        self.assertEqual(paths(first_seen_since="2026-10-01"), [])
+
+
+class _Sitemap(StandInHandler):
+    def do_GET(self):
+        body = (
+            b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            b"<url><loc>https://www.claro.com.pe/planes_bkp/</loc></url>"
+            b"<url><loc>https://www.claro.com.pe/ofertas_x/</loc></url>"
+            b"</urlset>"
+        )
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HandlerIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "urls.db")
+        self.env = mock.patch.dict(os.environ, {"URL_INDEX_DB": self.db, "SUFFIXES": "_bkp"})
+        self.env.start()
+        self.sitemap, self.sitemap_base = start_server(_Sitemap)
+        self.app, self.app_base = start_server(Handler)
+
+    def tearDown(self):
+        stop_server(self.app)
+        stop_server(self.sitemap)
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def _get(self, path: str) -> dict:
+        with urllib.request.urlopen(f"{self.app_base}{path}", timeout=10) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def test_only_configured_suffixes_are_indexed(self):
+        sitemap = f"{self.sitemap_base}/sitemap.xml"
+        self._get(f"/urls-a-eliminar?sitemap={sitemap}&suffixes=_x")
+        self.assertEqual(self._get(f"/index/runs?sitemap={sitemap}")["count"], 0)
+
+        self._get(f"/urls-a-eliminar?sitemap={sitemap}")
+        self.assertEqual(self._get(f"/index/runs?sitemap={sitemap}")["count"], 1)
+        flagged = self._get(f"/index/urls?sitemap={sitemap}&matches=1")["urls"]
+        self.assertEqual([u["url"] for u in flagged], ["https://www.claro.com.pe/planes_bkp/"])
+
+
+if __name__ == "__main__":
+    unittest.main()
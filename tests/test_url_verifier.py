@@ -0,0 +1,154 @@
+import threading
+import time
+import unittest
+
+from server import UrlVerifier, render_verify_cells
+from tests.standin import StandInHandler, StandInTestCase
+
+
+class _StandIn(StandInHandler):
+    # Rutas: /moved/... 301, /gone/... 404, /nohead/... 405 en HEAD, /slow/... tarda 3 s; el resto 200.
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    requests: list[tuple[str, str, float]] = []
+    clients: set[tuple[str, int]] = set()
+
+    def _respond(self, head: bool) -> None:
+        with self.lock:
+            self.requests.append((self.command, self.path, time.monotonic()))
+            self.clients.add(self.client_address)
+
+        if self.path.startswith("/moved"):
+            self._empty(301, {"Location": "/nuevo/"})
+            return
+        if self.path.startswith("/gone"):
+            self._empty(404)
+            return
+        if self.path.startswith("/nohead") and head:
+            self._empty(405)
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(3)
+
+        body = b"x" * 4096
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+
+class UrlVerifierTest(StandInTestCase):
+    handler_class = _StandIn
+
+    def setUp(self):
+        with _StandIn.lock:
+            _StandIn.requests.clear()
+            _StandIn.clients.clear()
+
+    def test_attaches_status_redirect_and_latency(self):
+        entries = [
+            {"url": f"{self.base}/ok_1/"},
+            {"url": f"{self.base}/moved_1/"},
+            {"url": f"{self.base}/gone_1/"},
+            {"url": f"{self.base}/nohead_1/"},
+            {"url": "http://127.0.0.1:1/cerrado_1/"},
+        ]
+        stats = UrlVerifier(concurrency=4, per_host_rps=0).run(entries)
+
+        ok, moved, gone, nohead, refused = entries
+        self.assertEqual(ok["status"], 200)
+        self.assertIsNone(ok["redirect_to"])
+        self.assertIsInstance(ok["latency_ms"], int)
+        self.assertEqual(moved["status"], 301)
+        self.assertEqual(moved["redirect_to"], f"{self.base}/nuevo/")
+        self.assertEqual(gone["status"], 404)
+        self.assertEqual(nohead["status"], 200)
+        self.assertIsNone(refused["status"])
+        self.assertTrue(refused["verify_error"])
+
+        self.assertIn(("GET", "/nohead_1/"), [(m, p) for m, p, _ in _StandIn.requests])
+        self.assertEqual(stats["checked"], 4)
+        self.assertEqual(stats["2xx"], 2)
+        self.assertEqual(stats["3xx"], 1)
+        self.assertEqual(stats["4xx"], 1)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["skipped"], 0)
+
+    def test_reuses_connections_per_worker(self):
+        entries = [{"url": f"{self.base}/ok{i}_1/"} for i in range(12)]
+        stats = UrlVerifier(concurrency=2, per_host_rps=0).run(entries)
+
+        self.assertEqual(stats["2xx"], 12)
+        self.assertLessEqual(len(_StandIn.clients), 2)
+
+    def test_rate_limits_per_host(self):
+        entries = [{"url": f"{self.base}/ok{i}_1/"} for i in range(6)]
+        UrlVerifier(concurrency=6, per_host_rps=10).run(entries)
+
+        starts = sorted(t for _, _, t in _StandIn.requests)
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        self.assertEqual(len(starts), 6)
+        self.assertGreaterEqual(min(gaps), 0.08)
+
+    def test_enforces_total_budget(self):
+        entries = [{"url": f"{self.base}/ok{i}_1/"} for i in range(40)]
+        started = time.monotonic()
+        stats = UrlVerifier(concurrency=8, per_host_rps=5, budget_seconds=2).run(entries)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2.5)
+        self.assertEqual(stats["checked"] + stats["skipped"], 40)
+        self.assertLessEqual(stats["checked"], 11)
+        self.assertGreaterEqual(stats["skipped"], 29)
+        skipped = [e for e in entries if e.get("verify_error") == "budget_exceeded"]
+        self.assertTrue(all(e["status"] is None for e in skipped))
+
+    def test_caps_request_timeout_at_budget(self):
+        entries = [{"url": f"{self.base}/slow_1/"}]
+        started = time.monotonic()
+        stats = UrlVerifier(per_host_rps=0, budget_seconds=0.5, timeout_seconds=10).run(entries)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(stats["errors"], 1)
+
+    def test_encodes_non_ascii_targets(self):
+        entries = [
+            {"url": f"{self.base}/año_bkp/?q=café"},
+            {"url": f"{self.base}/ya%20codificada_bkp/"},
+        ]
+        stats = UrlVerifier(per_host_rps=0).run(entries)
+
+        self.assertEqual(stats["2xx"], 2)
+        paths = [p for _, p, _ in _StandIn.requests]
+        self.assertIn("/a%C3%B1o_bkp/?q=caf%C3%A9", paths)
+        self.assertIn("/ya%20codificada_bkp/", paths)
+
+    def test_idna_encodes_host(self):
+        _, netloc, target = UrlVerifier._http_target("https://bücher.example:8443/a b/")
+        self.assertEqual(netloc, "xn--bcher-kva.example:8443")
+        self.assertEqual(target, "/a%20b/")
+
+
+class RenderVerifyCellsTest(unittest.TestCase):
+    def test_renders_status_redirect_and_latency(self):
+        cells = render_verify_cells({"status": 301, "redirect_to": "https://x/?a=1&b=2", "latency_ms": 42})
+        self.assertEqual(cells.count("<td"), 3)
+        self.assertIn(">301<", cells)
+        self.assertIn("a=1&amp;b=2", cells)
+        self.assertIn(">42<", cells)
+
+    def test_renders_error_without_latency(self):
+        cells = render_verify_cells({"status": None, "verify_error": "<timeout>", "latency_ms": None})
+        self.assertIn("&lt;timeout&gt;", cells)
+        self.assertEqual(cells.count("<td"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
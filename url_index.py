@@ -0,0 +1,207 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    sitemap TEXT NOT NULL,
+    suffixes TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    total_urls INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_sitemap_started ON runs (sitemap, started_at);
+
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    sitemap TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    lastmod TEXT,
+    matches INTEGER NOT NULL,
+    first_seen_run INTEGER NOT NULL REFERENCES runs (id),
+    first_seen_at TEXT NOT NULL,
+    last_seen_run INTEGER NOT NULL REFERENCES runs (id),
+    last_seen_at TEXT NOT NULL,
+    UNIQUE (sitemap, url)
+);
+CREATE INDEX IF NOT EXISTS idx_urls_path ON urls (sitemap, path);
+CREATE INDEX IF NOT EXISTS idx_urls_lastmod ON urls (sitemap, lastmod);
+CREATE INDEX IF NOT EXISTS idx_urls_first_seen ON urls (sitemap, first_seen_at);
+
+CREATE TABLE IF NOT EXISTS run_urls (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    url_id INTEGER NOT NULL REFERENCES urls (id),
+    lastmod TEXT,
+    matches INTEGER NOT NULL,
+    PRIMARY KEY (run_id, url_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_run_urls_url ON run_urls (url_id);
+"""
+
+
+def index_path_from_env() -> str | None:
+    return os.environ.get("URL_INDEX_DB", "").strip() or None
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def open_index(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_crawl(
+    conn: sqlite3.Connection,
+    sitemap_url: str,
+    suffixes: tuple[str, ...],
+    urls_by_loc: dict[str, str | None],
+    to_delete: list[dict],
+    started_at: str | None = None,
+) -> int:
+    finished_at = utc_now()
+    started_at = started_at or finished_at
+    flagged = {item["url"] for item in to_delete}
+
+    rows = []
+    for url, lastmod in urls_by_loc.items():
+        url = url.strip()
+        if not url:
+            continue
+        rows.append((url, urlparse(url).path or "/", lastmod, int(url in flagged)))
+    count = sum(row[3] for row in rows)
+
+    # Una sola transacción: todo el crawl se guarda o no se guarda nada.
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO runs (sitemap, suffixes, started_at, finished_at, total_urls, count) VALUES (?, ?, ?, ?, ?, ?)",
+            (sitemap_url, ",".join(suffixes), started_at, finished_at, len(rows), count),
+        )
+        run_id = cur.lastrowid
+        conn.executemany(
+            """
+            INSERT INTO urls (sitemap, url, path, lastmod, matches, first_seen_run, first_seen_at, last_seen_run, last_seen_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (sitemap, url) DO UPDATE SET
+                lastmod = excluded.lastmod,
+                matches = excluded.matches,
+                last_seen_run = excluded.last_seen_run,
+                last_seen_at = excluded.last_seen_at
+            """,
+            [
+                (sitemap_url, url, path, lastmod, matches, run_id, started_at, run_id, started_at)
+                for url, path, lastmod, matches in rows
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO run_urls (run_id, url_id, lastmod, matches) SELECT ?, id, ?, ? FROM urls WHERE sitemap = ? AND url = ?",
+            [(run_id, lastmod, matches, sitemap_url, url) for url, _, lastmod, matches in rows],
+        )
+    return run_id
+
+
+def save_crawl(
+    db_path: str,
+    sitemap_url: str,
+    suffixes: tuple[str, ...],
+    urls_by_loc: dict[str, str | None],
+    to_delete: list[dict],
+    started_at: str | None = None,
+) -> int:
+    conn = open_index(db_path)
+    try:
+        return record_crawl(conn, sitemap_url, suffixes, urls_by_loc, to_delete, started_at=started_at)
+    finally:
+        conn.close()
+
+
+def list_runs(
+    conn: sqlite3.Connection,
+    sitemap_url: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    where = []
+    params: list = []
+    if sitemap_url:
+        where.append("sitemap = ?")
+        params.append(sitemap_url)
+    if since:
+        where.append("started_at >= ?")
+        params.append(since)
+    if until:
+        # Comparación de prefijos ISO: "2026-09-30" incluye todo ese día.
+        where.append("substr(started_at, 1, ?) <= ?")
+        params.extend([len(until), until])
+    sql = "SELECT id, sitemap, suffixes, started_at, finished_at, total_urls, count FROM runs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def get_url_history(conn: sqlite3.Connection, sitemap_url: str, url: str) -> dict | None:
+    row = conn.execute(
+        "SELECT id, sitemap, url, path, lastmod, matches, first_seen_at, last_seen_at FROM urls WHERE sitemap = ? AND url = ?",
+        (sitemap_url, url.strip()),
+    ).fetchone()
+    if row is None:
+        return None
+    history = conn.execute(
+        """
+        SELECT runs.id AS run_id, runs.started_at, run_urls.lastmod, run_urls.matches
+        FROM run_urls JOIN runs ON runs.id = run_urls.run_id
+        WHERE run_urls.url_id = ?
+        ORDER BY runs.started_at, runs.id
+        """,
+        (row["id"],),
+    ).fetchall()
+    out = dict(row)
+    del out["id"]
+    out["matches"] = bool(out["matches"])
+    out["runs_seen"] = len(history)
+    out["history"] = [dict(h, matches=bool(h["matches"])) for h in history]
+    return out
+
+
+def list_urls(
+    conn: sqlite3.Connection,
+    sitemap_url: str,
+    path_prefix: str | None = None,
+    matches: bool | None = None,
+    first_seen_since: str | None = None,
+    lastmod_since: str | None = None,
+    limit: int = 500,
+) -> list[dict]:
+    where = ["sitemap = ?"]
+    params: list = [sitemap_url]
+    if path_prefix:
+        # Rango en lugar de LIKE para que SQLite use idx_urls_path.
+        where.append("path >= ? AND path < ?")
+        params.extend([path_prefix, path_prefix + "\U0010ffff"])
+    if matches is not None:
+        where.append("matches = ?")
+        params.append(int(matches))
+    if first_seen_since:
+        where.append("first_seen_at >= ?")
+        params.append(first_seen_since)
+    if lastmod_since:
+        where.append("lastmod >= ?")
+        params.append(lastmod_since)
+    sql = "SELECT sitemap, url, path, lastmod, matches, first_seen_at, last_seen_at FROM urls"
+    sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY first_seen_at DESC, url LIMIT ?"
+    params.append(limit)
+    return [dict(row, matches=bool(row["matches"])) for row in conn.execute(sql, params)]